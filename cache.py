@@ -0,0 +1,58 @@
+"""
+Cache Helper Functions
+
+Redis-backed read-through cache for catalogue responses. Caching is optional:
+when REDIS_URL is not set (or Redis is unreachable) every lookup is a miss and
+callers fall through to MongoDB.
+"""
+
+import os
+import orjson
+import redis
+import redis.asyncio
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_TTL = 60
+
+_redis = None
+
+redis_url = os.getenv("REDIS_URL")
+
+if redis_url:
+    _redis = redis.asyncio.Redis.from_url(redis_url)
+
+
+async def cache_get(key: str):
+    """Return the cached value for key, or None on miss"""
+    if _redis is None:
+        return None
+    try:
+        cached = await _redis.get(key)
+    except redis.RedisError:
+        return None
+    return orjson.loads(cached) if cached is not None else None
+
+
+async def cache_set(key: str, value, ttl: int = DEFAULT_TTL):
+    """Store a JSON-serializable value under key for ttl seconds"""
+    if _redis is None:
+        return
+    try:
+        await _redis.set(key, orjson.dumps(value, default=str), ex=ttl)
+    except redis.RedisError:
+        pass
+
+
+async def invalidate_products():
+    """Drop all cached catalogue entries; call after writing to the product collection"""
+    if _redis is None:
+        return
+    try:
+        keys = [k async for k in _redis.scan_iter("products:*")]
+        keys += [k async for k in _redis.scan_iter("product:*")]
+        if keys:
+            await _redis.delete(*keys)
+    except redis.RedisError:
+        pass
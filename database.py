@@ -3,9 +3,11 @@ Database Helper Functions
 
 MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
+The client is Motor (async), so the helpers are coroutines and must be awaited.
 """
 
-from pymongo import MongoClient
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -22,11 +24,13 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    # minPoolSize keeps warm connections open so the first requests after boot
+    # don't pay for the TCP/TLS handshake; see the lifespan ping in main.py
+    _client = AsyncIOMotorClient(database_url, maxPoolSize=50, minPoolSize=10, serverSelectionTimeoutMS=2000)
     db = _client[database_name]
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,16 +44,68 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None):
+    """Get documents from collection, optionally restricted to the projected fields"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = db[collection_name].find(filter_dict or {}, projection)
     if limit:
         cursor = cursor.limit(limit)
     
-    return list(cursor)
+    return await cursor.to_list(length=limit or None)
+
+
+class ProductLoader:
+    """Coalesce concurrent lookups by _id into a single `$in` query.
+
+    Ids requested within `delay` seconds of each other (e.g. by concurrent
+    checkouts) share one round-trip to the collection.
+    """
+
+    def __init__(self, collection_name: str = "product", delay: float = 0.002, projection: dict = None):
+        self.collection_name = collection_name
+        self.projection = projection
+        self.delay = delay
+        self._pending = {}
+        self._dispatch_task = None
+
+    async def load_many(self, ids: list) -> dict:
+        """Return {str(_id): document} for the ids that exist"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for oid in ids:
+            fut = self._pending.get(oid)
+            if fut is None:
+                fut = self._pending[oid] = loop.create_future()
+            futures.append(fut)
+        if self._dispatch_task is None:
+            self._dispatch_task = loop.create_task(self._dispatch())
+
+        # Futures are shared between callers, so don't let one caller's
+        # cancellation cancel them for everyone else.
+        docs = await asyncio.gather(*(asyncio.shield(f) for f in futures))
+        return {str(d["_id"]): d for d in docs if d is not None}
+
+    async def _dispatch(self):
+        await asyncio.sleep(self.delay)
+        batch, self._pending, self._dispatch_task = self._pending, {}, None
+        try:
+            docs = await self._fetch(list(batch))
+        except Exception as e:
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        found = {d["_id"]: d for d in docs}
+        for oid, fut in batch.items():
+            if not fut.done():
+                fut.set_result(found.get(oid))
+
+    async def _fetch(self, ids: list) -> list:
+        if db is None:
+            raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+        return await db[self.collection_name].find({"_id": {"$in": ids}}, self.projection).to_list(length=len(ids))
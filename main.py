@@ -1,126 +1,244 @@
 import os
-from fastapi import FastAPI, HTTPException
+import re
+import sys
+from contextlib import asynccontextmanager
+import orjson
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from bson.objectid import ObjectId
 
-from database import db, create_document, get_documents
-from schemas import Product, Order
+from database import db, create_document, get_documents, ProductLoader
+from cache import cache_get, cache_set
 
-app = FastAPI(title="Anti-Tarnish Jewellery Store API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the Mongo connection pool before serving traffic. A failed ping is
+    # not fatal: endpoints already fall back to the seed catalogue.
+    if db is not None:
+        try:
+            await db.command("ping")
+        except Exception:
+            pass
+    yield
+
+
+app = FastAPI(title="Anti-Tarnish Jewellery Store API", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Checkout only needs price, title and the first image of each product
+product_loader = ProductLoader(projection={"title": 1, "price": 1, "images": {"$slice": 1}})
+
+# Fields shown on catalogue listings; the detail endpoint returns the full document
+_LISTING_PROJECTION = {
+    "title": 1,
+    "price": 1,
+    "category": 1,
+    "images": {"$slice": 1},
+    "in_stock": 1,
+    "stock_qty": 1,
+    "color_tone": 1,
+    "highlights": 1,
+}
+
+# Lowercase hex, as produced by str(ObjectId); matching ids are decoded
+# straight to the 12 raw bytes so ObjectId skips its own validation.
+_OID_RE = re.compile(r"[0-9a-f]{24}")
+
+# Environment is read once at startup; /test reports these flags
+_HAS_DB_URL = bool(os.getenv("DATABASE_URL"))
+_HAS_DB_NAME = bool(os.getenv("DATABASE_NAME"))
+
+# Comma-separated list of storefront origins; "*" keeps the API open to any origin
+cors_origins = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
 )
 
 
+# Seed catalogue served when the database is unavailable. Kept as plain dicts
+# (the serialized shape of `Product`, with fake ids for frontend linking) so the
+# fallback path doesn't pay for model validation and dumping on every request.
+_SEED_PRODUCTS = [
+    {
+        "id": "seed-0",
+        "title": "Luna Halo Ring",
+        "description": "Anti-tarnish sterling silver ring with cubic zirconia halo.",
+        "price": 59.0,
+        "category": "Rings",
+        "images": [
+            "https://images.unsplash.com/photo-1520962918287-7448c2878f65?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "in_stock": True,
+        "stock_qty": 25,
+        "rating": 4.8,
+        "anti_tarnish": True,
+        "color_tone": "rose-gold",
+        "highlights": ["Anti-tarnish coat", "Hypoallergenic", "Shimmer finish"],
+    },
+    {
+        "id": "seed-1",
+        "title": "Aurora Tennis Bracelet",
+        "description": "Dainty bracelet with brilliant shine and long-lasting finish.",
+        "price": 89.0,
+        "category": "Bracelets",
+        "images": [
+            "https://images.unsplash.com/photo-1599643477877-530eb83abc8e?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "in_stock": True,
+        "stock_qty": 18,
+        "rating": 4.8,
+        "anti_tarnish": True,
+        "color_tone": "platinum",
+        "highlights": ["Water resistant", "Nickel-free", "Everyday wear"],
+    },
+    {
+        "id": "seed-2",
+        "title": "Celeste Pendant Necklace",
+        "description": "Minimal pendant that catches light like a star.",
+        "price": 72.0,
+        "category": "Necklaces",
+        "images": [
+            "https://images.unsplash.com/photo-1617038260897-1039e0c1f16f?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "in_stock": True,
+        "stock_qty": 30,
+        "rating": 4.8,
+        "anti_tarnish": True,
+        "color_tone": "rose-gold",
+        "highlights": ["Anti-tarnish", "Lightweight", "Gift-ready"],
+    },
+    {
+        "id": "seed-3",
+        "title": "Nova Stud Earrings",
+        "description": "Classic studs with mirror polish and protective finish.",
+        "price": 45.0,
+        "category": "Earrings",
+        "images": [
+            "https://images.unsplash.com/photo-1616400619175-5beda3a97703?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "in_stock": True,
+        "stock_qty": 40,
+        "rating": 4.8,
+        "anti_tarnish": True,
+        "color_tone": "platinum",
+        "highlights": ["Secure clasp", "Daily wear", "Anti-tarnish"],
+    },
+]
+_SEED_BY_ID = {p["id"]: p for p in _SEED_PRODUCTS}
+_SEED_PRICE_CENTS = {p["id"]: round(p["price"] * 100) for p in _SEED_PRODUCTS}
+
+# Product keys read in the checkout loop, interned explicitly
+_K_PRICE = sys.intern("price")
+_K_TITLE = sys.intern("title")
+_K_IMAGES = sys.intern("images")
+
+# Checkout arithmetic is done in integer cents
+_FALLBACK_PRICE_CENTS = 5000
+_FREE_SHIPPING_CENTS = 10000
+_SHIPPING_CENTS = 600
+
+
 def serialize_doc(doc):
+    # Build a new dict rather than mutating the caller's document
     if not doc:
         return doc
-    doc["id"] = str(doc.get("_id"))
-    doc.pop("_id", None)
-    return doc
+    out = {k: v for k, v in doc.items() if k != "_id"}
+    out["id"] = str(doc.get("_id"))
+    return out
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Anti-Tarnish Jewellery API ready"}
 
 
 @app.get("/api/products")
-def list_products(category: Optional[str] = None, limit: int = 50):
+async def list_products(category: Optional[str] = None, limit: int = 50, accept: Optional[str] = Header(None)):
     filt = {"category": category} if category else {}
+    if accept and "application/x-ndjson" in accept:
+        # Pull the first document before committing to a 200 so that an
+        # unreachable DB falls back to the seed catalogue, as for plain JSON
+        try:
+            cursor = db["product"].find(filt, _LISTING_PROJECTION)
+            if limit:
+                cursor = cursor.limit(limit)
+            first = await anext(cursor, None)
+        except Exception:
+            return StreamingResponse(_ndjson(_seed_products(category, limit)), media_type="application/x-ndjson")
+        return StreamingResponse(_stream_products(first, cursor), media_type="application/x-ndjson")
+
+    cache_key = f"products:{category or ''}:{limit}"
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        items = get_documents("product", filt, limit)
-        return [serialize_doc(i) for i in items]
+        items = [serialize_doc(i) for i in await get_documents("product", filt, limit, _LISTING_PROJECTION)]
+        await cache_set(cache_key, items)
+        return items
     except Exception:
-        # If no products yet or DB not connected, seed a small catalogue in-memory for response
-        sample = [
-            Product(
-                title="Luna Halo Ring",
-                description="Anti-tarnish sterling silver ring with cubic zirconia halo.",
-                price=59.0,
-                category="Rings",
-                images=[
-                    "https://images.unsplash.com/photo-1520962918287-7448c2878f65?q=80&w=1200&auto=format&fit=crop",
-                ],
-                in_stock=True,
-                stock_qty=25,
-                color_tone="rose-gold",
-                highlights=["Anti-tarnish coat", "Hypoallergenic", "Shimmer finish"],
-            ).model_dump(),
-            Product(
-                title="Aurora Tennis Bracelet",
-                description="Dainty bracelet with brilliant shine and long-lasting finish.",
-                price=89.0,
-                category="Bracelets",
-                images=[
-                    "https://images.unsplash.com/photo-1599643477877-530eb83abc8e?q=80&w=1200&auto=format&fit=crop",
-                ],
-                stock_qty=18,
-                color_tone="platinum",
-                highlights=["Water resistant", "Nickel-free", "Everyday wear"],
-            ).model_dump(),
-            Product(
-                title="Celeste Pendant Necklace",
-                description="Minimal pendant that catches light like a star.",
-                price=72.0,
-                category="Necklaces",
-                images=[
-                    "https://images.unsplash.com/photo-1617038260897-1039e0c1f16f?q=80&w=1200&auto=format&fit=crop",
-                ],
-                stock_qty=30,
-                color_tone="rose-gold",
-                highlights=["Anti-tarnish", "Lightweight", "Gift-ready"],
-            ).model_dump(),
-            Product(
-                title="Nova Stud Earrings",
-                description="Classic studs with mirror polish and protective finish.",
-                price=45.0,
-                category="Earrings",
-                images=[
-                    "https://images.unsplash.com/photo-1616400619175-5beda3a97703?q=80&w=1200&auto=format&fit=crop",
-                ],
-                stock_qty=40,
-                color_tone="platinum",
-                highlights=["Secure clasp", "Daily wear", "Anti-tarnish"],
-            ).model_dump(),
-        ]
-        # attach fake ids for frontend linking
-        for idx, s in enumerate(sample):
-            s["id"] = f"seed-{idx}"
-        if category:
-            sample = [s for s in sample if s.get("category") == category]
-        return sample[:limit]
+        # If no products yet or DB not connected, serve the in-memory seed catalogue
+        return _seed_products(category, limit)
+
+
+def _seed_products(category: Optional[str], limit: int):
+    items = _SEED_PRODUCTS
+    if category:
+        items = [s for s in items if s["category"] == category]
+    return items[:limit]
+
+
+def _ndjson(items: list):
+    for item in items:
+        yield orjson.dumps(item) + b"\n"
+
+
+async def _stream_products(first: Optional[dict], cursor):
+    # One JSON document per line, encoded as each doc arrives from the cursor
+    if first is None:
+        return
+    yield orjson.dumps(serialize_doc(first), default=str) + b"\n"
+    async for doc in cursor:
+        yield orjson.dumps(serialize_doc(doc), default=str) + b"\n"
 
 
 @app.get("/api/products/{product_id}")
-def get_product(product_id: str):
+async def get_product(product_id: str):
     # If looks like a Mongo ObjectId try DB, else return from seeded list by index
-    if len(product_id) == 24:
+    if _OID_RE.fullmatch(product_id):
+        cache_key = f"product:{product_id}"
+        cached = await cache_get(cache_key)
+        if cached is not None:
+            return cached
         try:
-            doc = db["product"].find_one({"_id": ObjectId(product_id)})
+            doc = await db["product"].find_one({"_id": ObjectId(bytes.fromhex(product_id))})
             if not doc:
                 raise HTTPException(status_code=404, detail="Product not found")
-            return serialize_doc(doc)
+            doc = serialize_doc(doc)
+            await cache_set(cache_key, doc)
+            return doc
         except Exception:
             pass
     # fallback to seeded items mapping
-    base = list_products()
-    for p in base:
-        if p.get("id") == product_id:
-            return p
-    raise HTTPException(status_code=404, detail="Product not found")
+    try:
+        return _SEED_BY_ID[product_id]
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Product not found")
 
 
 class CartItem(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     product_id: str
-    quantity: int
+    quantity: int = Field(..., ge=1)
 
 
 class CheckoutRequest(BaseModel):
@@ -137,77 +255,76 @@ class CheckoutRequest(BaseModel):
 
 
 @app.post("/api/checkout")
-def checkout(payload: CheckoutRequest):
+async def checkout(payload: CheckoutRequest):
     # Fetch products to compute totals and validate stock
-    ids = [ObjectId(i.product_id) for i in payload.items if len(i.product_id) == 24]
+    ids = [ObjectId(bytes.fromhex(i.product_id)) for i in payload.items if _OID_RE.fullmatch(i.product_id)]
     prod_map = {}
     try:
         if ids:
-            products = list(db["product"].find({"_id": {"$in": ids}}))
-            for p in products:
-                prod_map[str(p["_id"])]=p
+            prod_map = await product_loader.load_many(ids)
     except Exception:
         pass
 
     order_items = []
-    subtotal = 0.0
+    subtotal_cents = 0
     for ci in payload.items:
         # If product not found in DB, fallback price
         base = prod_map.get(ci.product_id)
         if base:
-            price = float(base.get("price", 0))
-            title = base.get("title", "Item")
-            image = (base.get("images") or [None])[0]
+            price_cents = round(float(base.get(_K_PRICE, 0)) * 100)
+            title = base.get(_K_TITLE, "Item")
+            image = (base.get(_K_IMAGES) or [None])[0]
         else:
             # fallback seed lookup
-            seed = None
-            if not base:
-                for p in list_products():
-                    if p.get("id") == ci.product_id:
-                        seed = p
-                        break
-            price = float((seed or {}).get("price", 50.0))
-            title = (seed or {}).get("title", "Jewellery Piece")
-            image = (seed or {}).get("images", [None])[0]
-        line = price * ci.quantity
-        subtotal += line
+            seed = _SEED_BY_ID.get(ci.product_id)
+            price_cents = _SEED_PRICE_CENTS.get(ci.product_id, _FALLBACK_PRICE_CENTS)
+            title = (seed or {}).get(_K_TITLE, "Jewellery Piece")
+            image = (seed or {}).get(_K_IMAGES, [None])[0]
+        subtotal_cents += price_cents * ci.quantity
         order_items.append({
             "product_id": ci.product_id,
             "title": title,
-            "price": price,
+            "price": price_cents / 100,
             "quantity": ci.quantity,
             "image": image,
         })
 
-    shipping = 0 if subtotal >= 100 else 6.0
-    total = round(subtotal + shipping, 2)
-
-    order = Order(
-        items=order_items,
-        subtotal=round(subtotal, 2),
-        shipping=shipping,
-        total=total,
-        customer_name=payload.customer_name,
-        customer_email=payload.customer_email,
-        address_line1=payload.address_line1,
-        address_line2=payload.address_line2,
-        city=payload.city,
-        state=payload.state,
-        postal_code=payload.postal_code,
-        country=payload.country,
-        notes=payload.notes,
-    )
+    shipping_cents = 0 if subtotal_cents >= _FREE_SHIPPING_CENTS else _SHIPPING_CENTS
+    total_cents = subtotal_cents + shipping_cents
+
+    subtotal = subtotal_cents / 100
+    shipping = shipping_cents / 100
+    total = total_cents / 100
+
+    # Stored in the shape of schemas.Order. Customer fields come from the
+    # already-validated CheckoutRequest and totals are computed here, so the
+    # document is written as a plain dict without another validation pass.
+    order = {
+        "items": order_items,
+        "subtotal": subtotal,
+        "shipping": shipping,
+        "total": total,
+        "customer_name": payload.customer_name,
+        "customer_email": payload.customer_email,
+        "address_line1": payload.address_line1,
+        "address_line2": payload.address_line2,
+        "city": payload.city,
+        "state": payload.state,
+        "postal_code": payload.postal_code,
+        "country": payload.country,
+        "notes": payload.notes,
+    }
 
     try:
-        order_id = create_document("order", order)
+        order_id = await create_document("order", order)
     except Exception:
         order_id = None
 
-    return {"order_id": order_id, "subtotal": order.subtotal, "shipping": order.shipping, "total": order.total}
+    return {"order_id": order_id, "subtotal": subtotal, "shipping": shipping, "total": total}
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -224,7 +341,7 @@ def test_database():
             response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -234,9 +351,8 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    import os as _os
-    response["database_url"] = "✅ Set" if _os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if _os.getenv("DATABASE_NAME") else "❌ Not Set"
+    response["database_url"] = "✅ Set" if _HAS_DB_URL else "❌ Not Set"
+    response["database_name"] = "✅ Set" if _HAS_DB_NAME else "❌ Not Set"
 
     return response
 
@@ -5,7 +5,7 @@ Each Pydantic model represents a collection in MongoDB. The collection name
 is the lowercase of the class name (e.g., Product -> "product").
 """
 from typing import List, Optional
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl, TypeAdapter
 
 
 class Product(BaseModel):
@@ -17,7 +17,7 @@ class Product(BaseModel):
     description: Optional[str] = Field(None, description="Product description")
     price: float = Field(..., ge=0, description="Price in USD")
     category: str = Field(..., description="Product category, e.g., 'Rings', 'Necklaces'")
-    images: List[HttpUrl] = Field(default_factory=list, description="List of product image URLs")
+    images: List[str] = Field(default_factory=list, description="List of product image URLs")
     in_stock: bool = Field(True, description="Availability flag")
     stock_qty: int = Field(0, ge=0, description="Quantity in stock")
     rating: float = Field(4.8, ge=0, le=5, description="Average rating")
@@ -26,12 +26,28 @@ class Product(BaseModel):
     highlights: List[str] = Field(default_factory=list, description="Key selling points")
 
 
+_http_url = TypeAdapter(HttpUrl)
+
+
+def validate_product_urls(product: Product) -> Product:
+    """
+    Validate image URLs once, when a product is written. Image fields are
+    plain strings so reads don't re-parse every URL.
+    Raises pydantic.ValidationError on an invalid URL.
+    """
+    for url in product.images:
+        _http_url.validate_python(url)
+    return product
+
+
 class OrderItem(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     product_id: str
     title: str
     price: float
     quantity: int = Field(..., ge=1)
-    image: Optional[HttpUrl] = None
+    image: Optional[str] = None
 
 
 class Order(BaseModel):